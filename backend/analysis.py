@@ -1,6 +1,31 @@
 import pandas as pd
 import numpy as np
 
+# Bump whenever the bands below change so memoized optimizer results are invalidated
+SCORING_RULES_VERSION = 1
+
+# Scoring bands as (low, high, points), checked in order; first match wins
+CN_RATIO_BANDS = ((25, 30, 20), (20, 35, 15), (15, 40, 10))
+MOISTURE_BANDS = ((50, 60, 20), (45, 65, 15), (40, 70, 10))
+TEMPERATURE_BANDS = ((55, 65, 20), (50, 70, 15), (45, 75, 10))
+AERATION_BANDS = ((3, 5, 15), (2, 6, 10))
+ODOR_BANDS = ((float('-inf'), 2, 10), (float('-inf'), 3, 7))
+DECOMPOSITION_BANDS = ((float('-inf'), 30, 15), (float('-inf'), 45, 10), (float('-inf'), 60, 5))
+
+def _band_points(value, bands, default):
+    """Return the points for the first band containing value"""
+    for low, high, points in bands:
+        if low <= value <= high:
+            return points
+    return default
+
+def band_points_vectorized(values, bands, default):
+    """Vectorized _band_points over a NumPy array"""
+    values = np.asarray(values)
+    conditions = [(values >= low) & (values <= high) for low, high, _ in bands]
+    choices = [points for _, _, points in bands]
+    return np.select(conditions, choices, default=default)
+
 def calculate_efficiency_score(data):
     """
     Calculate composting efficiency score (0-100)
@@ -9,67 +34,38 @@ def calculate_efficiency_score(data):
     score = 0
     
     # C/N Ratio (optimal: 25-30)
-    cn_ratio = float(data.get('cn_ratio', 0))
-    if 25 <= cn_ratio <= 30:
-        score += 20
-    elif 20 <= cn_ratio <= 35:
-        score += 15
-    elif 15 <= cn_ratio <= 40:
-        score += 10
-    else:
-        score += 5
+    score += _band_points(float(data.get('cn_ratio', 0)), CN_RATIO_BANDS, 5)
     
     # Moisture Level (optimal: 50-60%)
-    moisture = float(data.get('moisture_level', 0))
-    if 50 <= moisture <= 60:
-        score += 20
-    elif 45 <= moisture <= 65:
-        score += 15
-    elif 40 <= moisture <= 70:
-        score += 10
-    else:
-        score += 5
+    score += _band_points(float(data.get('moisture_level', 0)), MOISTURE_BANDS, 5)
     
     # Temperature (optimal: 55-65°C)
-    temperature = float(data.get('daily_temperature', 0))
-    if 55 <= temperature <= 65:
-        score += 20
-    elif 50 <= temperature <= 70:
-        score += 15
-    elif 45 <= temperature <= 75:
-        score += 10
-    else:
-        score += 5
+    score += _band_points(float(data.get('daily_temperature', 0)), TEMPERATURE_BANDS, 5)
     
     # Aeration (optimal: 3-5 times per week)
-    aeration = int(data.get('aeration_frequency', 0))
-    if 3 <= aeration <= 5:
-        score += 15
-    elif 2 <= aeration <= 6:
-        score += 10
-    else:
-        score += 5
+    score += _band_points(int(data.get('aeration_frequency', 0)), AERATION_BANDS, 5)
     
     # Odor Level (optimal: 1-2)
-    odor = int(data.get('odor_level', 5))
-    if odor <= 2:
-        score += 10
-    elif odor <= 3:
-        score += 7
-    else:
-        score += 3
+    score += _band_points(int(data.get('odor_level', 5)), ODOR_BANDS, 3)
     
     # Decomposition Time (bonus points for faster decomposition)
-    days = int(data.get('decomposition_days', 100))
-    if days <= 30:
-        score += 15
-    elif days <= 45:
-        score += 10
-    elif days <= 60:
-        score += 5
+    score += _band_points(int(data.get('decomposition_days', 100)), DECOMPOSITION_BANDS, 0)
     
     return min(score, 100)
 
+def calculate_efficiency_scores(cn_ratio, moisture_level, aeration_frequency,
+                                daily_temperature, odor_level, decomposition_days):
+    """Vectorized calculate_efficiency_score over equally-shaped NumPy arrays"""
+    score = (
+        band_points_vectorized(cn_ratio, CN_RATIO_BANDS, 5)
+        + band_points_vectorized(moisture_level, MOISTURE_BANDS, 5)
+        + band_points_vectorized(daily_temperature, TEMPERATURE_BANDS, 5)
+        + band_points_vectorized(aeration_frequency, AERATION_BANDS, 5)
+        + band_points_vectorized(odor_level, ODOR_BANDS, 3)
+        + band_points_vectorized(decomposition_days, DECOMPOSITION_BANDS, 0)
+    )
+    return np.minimum(score, 100)
+
 def generate_insights(df):
     """Generate analytics insights from experiments data"""
     if df.empty:
@@ -1,6 +1,8 @@
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+import io
+import click
 import pandas as pd
 import json
 from datetime import datetime, timedelta
@@ -11,6 +13,15 @@ from models import User, CompostingExperiment
 from auth import hash_password, verify_password
 from analysis import calculate_efficiency_score, generate_insights
 from reports import generate_pdf_report
+from archive import (
+    load_experiments, archive_experiments, compact_archive, experiments_signature,
+    delete_archived_experiment, upgrade_experiment_table
+)
+from charts import CHART_TITLES, render_chart
+from optimizer import (
+    parse_constraints, get_decomposition_model, restrict_to_model, optimize_parameters,
+    DEFAULT_ODOR_LEVEL, DEFAULT_LIMIT, MAX_LIMIT
+)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
@@ -18,6 +29,10 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///composting.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'your-jwt-secret-key'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['ARCHIVE_DIR'] = 'archive'
+app.config['ARCHIVE_AFTER_DAYS'] = 365
+app.config['CHART_CACHE_DIR'] = 'chart_cache'
+app.config['CHART_CACHE_MAX_BYTES'] = 50 * 1024 * 1024
 
 # Initialize extensions
 db.init_app(app)
@@ -27,6 +42,30 @@ jwt = JWTManager(app)
 # Initialize database
 with app.app_context():
     init_db()
+    upgrade_experiment_table(app.config['ARCHIVE_DIR'])
+
+def get_date_range():
+    """Parse optional start_date/end_date (YYYY-MM-DD, inclusive) query args"""
+    start = request.args.get('start_date')
+    end = request.args.get('end_date')
+    start = datetime.strptime(start, '%Y-%m-%d') if start else None
+    end = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    return start, end
+
+@app.cli.command('archive')
+@click.option('--older-than-days', type=int, default=None, help='Archive experiments older than this many days')
+def archive_command(older_than_days):
+    """Move old experiments into the compressed archive"""
+    if older_than_days is None:
+        older_than_days = app.config['ARCHIVE_AFTER_DAYS']
+    count = archive_experiments(app.config['ARCHIVE_DIR'], older_than_days)
+    click.echo(f'Archived {count} experiments')
+
+@app.cli.command('compact-archive')
+def compact_archive_command():
+    """Merge small archive files within each partition"""
+    count = compact_archive(app.config['ARCHIVE_DIR'])
+    click.echo(f'Compacted {count} partitions')
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -115,23 +154,23 @@ def get_experiments():
         username = get_jwt_identity()
         user = User.query.filter_by(username=username).first()
         
-        experiments = CompostingExperiment.query.filter_by(user_id=user.id).all()
+        experiments = load_experiments(user.id, app.config['ARCHIVE_DIR'])
         
         result = []
-        for exp in experiments:
+        for exp in experiments.itertuples(index=False):
             result.append({
-                'id': exp.id,
+                'id': int(exp.id),
                 'bin_id': exp.bin_id,
-                'cn_ratio': exp.cn_ratio,
-                'moisture_level': exp.moisture_level,
-                'aeration_frequency': exp.aeration_frequency,
-                'daily_temperature': exp.daily_temperature,
-                'odor_level': exp.odor_level,
-                'decomposition_days': exp.decomposition_days,
-                'final_n': exp.final_n,
-                'final_p': exp.final_p,
-                'final_k': exp.final_k,
-                'efficiency_score': exp.efficiency_score,
+                'cn_ratio': float(exp.cn_ratio),
+                'moisture_level': float(exp.moisture_level),
+                'aeration_frequency': int(exp.aeration_frequency),
+                'daily_temperature': float(exp.daily_temperature),
+                'odor_level': int(exp.odor_level),
+                'decomposition_days': int(exp.decomposition_days),
+                'final_n': float(exp.final_n),
+                'final_p': float(exp.final_p),
+                'final_k': float(exp.final_k),
+                'efficiency_score': float(exp.efficiency_score),
                 'date_created': exp.date_created.isoformat()
             })
         
@@ -152,11 +191,22 @@ def delete_experiment(experiment_id):
             id=experiment_id, user_id=user.id
         ).first()
         
-        if not experiment:
+        # Delete from both tiers; an interrupted archive run can leave a copy in each.
+        # The hot row's date pins the archive lookup to a single partition.
+        try:
+            archived = delete_archived_experiment(
+                user.id, experiment_id, app.config['ARCHIVE_DIR'],
+                experiment.date_created if experiment else None
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+        
+        if not experiment and not archived:
             return jsonify({'error': 'Experiment not found'}), 404
         
-        db.session.delete(experiment)
-        db.session.commit()
+        if experiment:
+            db.session.delete(experiment)
+            db.session.commit()
         
         return jsonify({'message': 'Experiment deleted successfully'}), 200
         
@@ -171,29 +221,16 @@ def get_analytics():
         username = get_jwt_identity()
         user = User.query.filter_by(username=username).first()
         
-        experiments = CompostingExperiment.query.filter_by(user_id=user.id).all()
+        try:
+            start, end = get_date_range()
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
         
-        if not experiments:
-            return jsonify({'error': 'No experiments found'}), 404
+        df = load_experiments(user.id, app.config['ARCHIVE_DIR'], start, end)
         
-        # Convert to DataFrame for analysis
-        data = []
-        for exp in experiments:
-            data.append({
-                'bin_id': exp.bin_id,
-                'cn_ratio': exp.cn_ratio,
-                'moisture_level': exp.moisture_level,
-                'aeration_frequency': exp.aeration_frequency,
-                'daily_temperature': exp.daily_temperature,
-                'odor_level': exp.odor_level,
-                'decomposition_days': exp.decomposition_days,
-                'final_n': exp.final_n,
-                'final_p': exp.final_p,
-                'final_k': exp.final_k,
-                'efficiency_score': exp.efficiency_score
-            })
+        if df.empty:
+            return jsonify({'error': 'No experiments found'}), 404
         
-        df = pd.DataFrame(data)
         insights = generate_insights(df)
         
         return jsonify(insights), 200
@@ -209,26 +246,27 @@ def export_data():
         username = get_jwt_identity()
         user = User.query.filter_by(username=username).first()
         
-        experiments = CompostingExperiment.query.filter_by(user_id=user.id).all()
-        
-        data = []
-        for exp in experiments:
-            data.append({
-                'Bin ID': exp.bin_id,
-                'C/N Ratio': exp.cn_ratio,
-                'Moisture Level (%)': exp.moisture_level,
-                'Aeration Frequency': exp.aeration_frequency,
-                'Daily Temperature (°C)': exp.daily_temperature,
-                'Odor Level': exp.odor_level,
-                'Decomposition Days': exp.decomposition_days,
-                'Final N': exp.final_n,
-                'Final P': exp.final_p,
-                'Final K': exp.final_k,
-                'Efficiency Score': exp.efficiency_score,
-                'Date Created': exp.date_created.strftime('%Y-%m-%d')
-            })
-        
-        df = pd.DataFrame(data)
+        try:
+            start, end = get_date_range()
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        
+        experiments = load_experiments(user.id, app.config['ARCHIVE_DIR'], start, end)
+        
+        df = pd.DataFrame({
+            'Bin ID': experiments['bin_id'],
+            'C/N Ratio': experiments['cn_ratio'],
+            'Moisture Level (%)': experiments['moisture_level'],
+            'Aeration Frequency': experiments['aeration_frequency'],
+            'Daily Temperature (°C)': experiments['daily_temperature'],
+            'Odor Level': experiments['odor_level'],
+            'Decomposition Days': experiments['decomposition_days'],
+            'Final N': experiments['final_n'],
+            'Final P': experiments['final_p'],
+            'Final K': experiments['final_k'],
+            'Efficiency Score': experiments['efficiency_score'],
+            'Date Created': experiments['date_created'].dt.strftime('%Y-%m-%d')
+        })
         filename = f'composting_data_{username}_{datetime.now().strftime("%Y%m%d")}.csv'
         filepath = os.path.join('exports', filename)
         
@@ -248,36 +286,60 @@ def generate_report():
         username = get_jwt_identity()
         user = User.query.filter_by(username=username).first()
         
-        experiments = CompostingExperiment.query.filter_by(user_id=user.id).all()
+        try:
+            start, end = get_date_range()
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
         
-        if not experiments:
-            return jsonify({'error': 'No experiments found'}), 404
+        df = load_experiments(user.id, app.config['ARCHIVE_DIR'], start, end)
         
-        # Convert to DataFrame
-        data = []
-        for exp in experiments:
-            data.append({
-                'bin_id': exp.bin_id,
-                'cn_ratio': exp.cn_ratio,
-                'moisture_level': exp.moisture_level,
-                'aeration_frequency': exp.aeration_frequency,
-                'daily_temperature': exp.daily_temperature,
-                'odor_level': exp.odor_level,
-                'decomposition_days': exp.decomposition_days,
-                'final_n': exp.final_n,
-                'final_p': exp.final_p,
-                'final_k': exp.final_k,
-                'efficiency_score': exp.efficiency_score
-            })
+        if df.empty:
+            return jsonify({'error': 'No experiments found'}), 404
         
-        df = pd.DataFrame(data)
-        filename = generate_pdf_report(df, username)
+        try:
+            charts = [
+                (title, render_chart(name, df, app.config['CHART_CACHE_DIR'], app.config['CHART_CACHE_MAX_BYTES']))
+                for name, title in CHART_TITLES.items()
+            ]
+        except Exception:
+            # Charts are optional; still deliver the tables if rendering fails
+            app.logger.exception('Chart rendering failed; building report without charts')
+            charts = None
+        filename = generate_pdf_report(df, username, charts)
         
         return send_file(filename, as_attachment=True, download_name=f'composting_report_{username}.pdf')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/charts/<chart_name>.png', methods=['GET'])
+@jwt_required()
+def get_chart(chart_name):
+    """Get a rendered chart image"""
+    try:
+        if chart_name not in CHART_TITLES:
+            return jsonify({'error': 'Chart not found'}), 404
+        
+        username = get_jwt_identity()
+        user = User.query.filter_by(username=username).first()
+        
+        try:
+            start, end = get_date_range()
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+        
+        df = load_experiments(user.id, app.config['ARCHIVE_DIR'], start, end)
+        
+        if df.empty:
+            return jsonify({'error': 'No experiments found'}), 404
+        
+        image = render_chart(chart_name, df, app.config['CHART_CACHE_DIR'], app.config['CHART_CACHE_MAX_BYTES'])
+        
+        return send_file(io.BytesIO(image), mimetype='image/png')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/best-practices', methods=['GET'])
 @jwt_required()
 def get_best_practices():
@@ -286,17 +348,18 @@ def get_best_practices():
         username = get_jwt_identity()
         user = User.query.filter_by(username=username).first()
         
-        experiments = CompostingExperiment.query.filter_by(user_id=user.id)\
-            .order_by(CompostingExperiment.efficiency_score.desc()).limit(3).all()
+        experiments = load_experiments(user.id, app.config['ARCHIVE_DIR'])
         
         if len(experiments) < 3:
             return jsonify({'error': 'Need at least 3 experiments for best practices'}), 400
         
+        experiments = experiments.nlargest(3, 'efficiency_score')
+        
         # Calculate averages of top 3
-        avg_cn = sum(exp.cn_ratio for exp in experiments) / 3
-        avg_moisture = sum(exp.moisture_level for exp in experiments) / 3
-        avg_aeration = sum(exp.aeration_frequency for exp in experiments) / 3
-        avg_temperature = sum(exp.daily_temperature for exp in experiments) / 3
+        avg_cn = float(experiments['cn_ratio'].mean())
+        avg_moisture = float(experiments['moisture_level'].mean())
+        avg_aeration = float(experiments['aeration_frequency'].mean())
+        avg_temperature = float(experiments['daily_temperature'].mean())
         
         best_practices = {
             'optimal_cn_ratio': round(avg_cn, 1),
@@ -306,9 +369,9 @@ def get_best_practices():
             'top_bins': [
                 {
                     'bin_id': exp.bin_id,
-                    'efficiency_score': exp.efficiency_score,
-                    'decomposition_days': exp.decomposition_days
-                } for exp in experiments
+                    'efficiency_score': float(exp.efficiency_score),
+                    'decomposition_days': int(exp.decomposition_days)
+                } for exp in experiments.itertuples(index=False)
             ],
             'recommendations': [
                 f"Maintain C/N ratio around {avg_cn:.1f} for optimal decomposition",
@@ -324,6 +387,49 @@ def get_best_practices():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/best-practices/optimize', methods=['GET'])
+@jwt_required()
+def optimize_best_practices():
+    """Search the parameter space for Pareto-best configurations within constraints"""
+    try:
+        username = get_jwt_identity()
+        user = User.query.filter_by(username=username).first()
+        
+        try:
+            constraints = parse_constraints(request.args)
+            odor_level = int(request.args.get('odor_level', DEFAULT_ODOR_LEVEL))
+            limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        model = None
+        if request.args.get('use_model', 'true').lower() != 'false':
+            model = get_decomposition_model(
+                user.id,
+                experiments_signature(user.id, app.config['ARCHIVE_DIR']),
+                lambda: load_experiments(user.id, app.config['ARCHIVE_DIR'])
+            )
+        
+        if model is not None:
+            # Only search where the model has data; fall back to the rules alone otherwise
+            restricted = restrict_to_model(constraints, model)
+            if restricted is None:
+                model = None
+            else:
+                constraints = restricted
+        
+        configurations = optimize_parameters(constraints, odor_level, model, limit)
+        
+        return jsonify({
+            'constraints': {name: {'min': low, 'max': high} for name, low, high in constraints},
+            'odor_level': odor_level,
+            'model_used': model is not None,
+            'configurations': configurations
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == "__main__":
 
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,291 @@
+import os
+import glob
+import uuid
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import func, text
+from sqlalchemy.schema import CreateTable
+
+from database import db
+from models import CompostingExperiment
+
+EXPERIMENT_COLUMNS = [
+    'id', 'bin_id', 'cn_ratio', 'moisture_level', 'aeration_frequency',
+    'daily_temperature', 'odor_level', 'decomposition_days',
+    'final_n', 'final_p', 'final_k', 'efficiency_score', 'date_created'
+]
+
+# Identifies an experiment across tiers. Ids alone are not enough on
+# databases created before the table used AUTOINCREMENT, where SQLite could
+# reissue the id of an archived experiment to a new one.
+EXPERIMENT_KEY = ['id', 'date_created']
+
+PARQUET_COMPRESSION = 'zstd'
+
+def _partition_dir(archive_dir, user_id, month):
+    """Directory holding one user's archived experiments for one month (YYYY-MM)"""
+    return os.path.join(archive_dir, f'user_id={user_id}', f'month={month}')
+
+def _new_part_path(partition_dir):
+    """Unique file name for a new archive part"""
+    return os.path.join(
+        partition_dir, f'part-{datetime.utcnow().strftime("%Y%m%d%H%M%S%f")}-{uuid.uuid4().hex}.parquet'
+    )
+
+@contextmanager
+def _partition_lock(partition_dir):
+    """
+    Hold an exclusive lock on a partition while its existing parts are
+    rewritten or removed, so deletes and compaction never interleave.
+    Appending a new part needs no lock.
+    """
+    with open(os.path.join(partition_dir, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _write_part(df, partition_dir):
+    """Atomically write df as a new part file in partition_dir and return its path"""
+    os.makedirs(partition_dir, exist_ok=True)
+    path = _new_part_path(partition_dir)
+    try:
+        df.to_parquet(path + '.tmp', compression=PARQUET_COMPRESSION, index=False)
+        os.replace(path + '.tmp', path)
+    except Exception:
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        raise
+    return path
+
+def _user_parts(archive_dir, user_id):
+    """All archive part files for a user"""
+    return sorted(glob.glob(os.path.join(archive_dir, f'user_id={user_id}', 'month=*', '*.parquet')))
+
+def _partitions_in_range(archive_dir, user_id, start=None, end=None):
+    """Partition directories for a user whose month overlaps [start, end)"""
+    partitions = []
+    for path in sorted(glob.glob(os.path.join(archive_dir, f'user_id={user_id}', 'month=*'))):
+        month_start = datetime.strptime(os.path.basename(path)[len('month='):], '%Y-%m')
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        if start and month_end <= start:
+            continue
+        if end and month_start >= end:
+            continue
+        partitions.append(path)
+    return partitions
+
+def _experiment_record(exp):
+    """Convert an experiment row into a plain dict"""
+    return {column: getattr(exp, column) for column in EXPERIMENT_COLUMNS}
+
+def load_experiments(user_id, archive_dir, start=None, end=None):
+    """
+    Load a user's experiments from both the hot table and the archive.
+    start is inclusive and end is exclusive; archive partitions outside the
+    range are never opened. An experiment present in both tiers (or in
+    several archive parts, after an interrupted archive or compaction run)
+    is returned once, preferring the hot row.
+    """
+    query = CompostingExperiment.query.filter_by(user_id=user_id)
+    if start:
+        query = query.filter(CompostingExperiment.date_created >= start)
+    if end:
+        query = query.filter(CompostingExperiment.date_created < end)
+
+    hot = pd.DataFrame([_experiment_record(exp) for exp in query.all()], columns=EXPERIMENT_COLUMNS)
+    hot['date_created'] = pd.to_datetime(hot['date_created'])
+    frames = [hot]
+
+    for partition in _partitions_in_range(archive_dir, user_id, start, end):
+        for path in sorted(glob.glob(os.path.join(partition, '*.parquet'))):
+            frames.append(pd.read_parquet(path, columns=EXPERIMENT_COLUMNS))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if frames:
+        # The hot frame comes first, so keep='first' prefers it
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(subset=EXPERIMENT_KEY, keep='first')
+    else:
+        df = pd.DataFrame(columns=EXPERIMENT_COLUMNS)
+    df['date_created'] = pd.to_datetime(df['date_created'])
+    if start:
+        df = df[df['date_created'] >= start]
+    if end:
+        df = df[df['date_created'] < end]
+
+    return df.sort_values('date_created').reset_index(drop=True)
+
+def experiments_signature(user_id, archive_dir):
+    """
+    Cheap summary of a user's experiment data across both tiers that changes
+    whenever experiments are added, deleted, archived or compacted.
+    """
+    count, latest = CompostingExperiment.query.with_entities(
+        func.count(CompostingExperiment.id), func.max(CompostingExperiment.date_created)
+    ).filter_by(user_id=user_id).one()
+    parts = tuple(os.path.relpath(path, archive_dir) for path in _user_parts(archive_dir, user_id))
+    return count, latest, parts
+
+def _has_autoincrement():
+    """Whether the experiment table can never reissue an id"""
+    if db.engine.dialect.name != 'sqlite':
+        return True
+    sql = db.session.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': CompostingExperiment.__tablename__}
+    ).scalar()
+    return sql is None or 'AUTOINCREMENT' in sql.upper()
+
+def upgrade_experiment_table(archive_dir):
+    """
+    Rebuild an experiment table created without AUTOINCREMENT so ids are
+    never reused, continuing numbering after every id issued so far,
+    including archived ones. Returns True if the table was rebuilt.
+    """
+    if _has_autoincrement():
+        return False
+
+    table = CompostingExperiment.__table__
+    hot_max = db.session.query(func.max(CompostingExperiment.id)).scalar() or 0
+    archived_max = max(
+        (int(pd.read_parquet(path, columns=['id'])['id'].max())
+         for path in glob.glob(os.path.join(archive_dir, 'user_id=*', 'month=*', '*.parquet'))),
+        default=0
+    )
+    db.session.commit()
+
+    create_sql = str(CreateTable(table).compile(db.engine)).strip()
+    columns = ', '.join(column.name for column in table.columns)
+    # executescript runs the whole rebuild in one transaction
+    connection = db.engine.raw_connection()
+    try:
+        connection.executescript(f'''
+            BEGIN;
+            ALTER TABLE {table.name} RENAME TO {table.name}_old;
+            {create_sql};
+            INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}_old;
+            DROP TABLE {table.name}_old;
+            DELETE FROM sqlite_sequence WHERE name = '{table.name}';
+            INSERT INTO sqlite_sequence (name, seq) VALUES ('{table.name}', {max(hot_max, archived_max)});
+            COMMIT;
+        ''')
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return True
+
+def archive_experiments(archive_dir, older_than_days):
+    """
+    Move experiments older than older_than_days into per-user, per-month
+    Parquet files and delete them from the hot table.
+    Returns the number of experiments archived.
+    """
+    if not _has_autoincrement():
+        raise RuntimeError('Experiment table lacks AUTOINCREMENT; run upgrade_experiment_table first')
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    experiments = CompostingExperiment.query.filter(CompostingExperiment.date_created < cutoff).all()
+
+    if not experiments:
+        return 0
+
+    df = pd.DataFrame([_experiment_record(exp) for exp in experiments], columns=EXPERIMENT_COLUMNS)
+    df['user_id'] = [exp.user_id for exp in experiments]
+    df['month'] = pd.to_datetime(df['date_created']).dt.strftime('%Y-%m')
+
+    # Parts are complete before any row is deleted. If we stop between the
+    # two steps the rows are in both tiers, which load_experiments tolerates.
+    written = []
+    try:
+        for (user_id, month), group in df.groupby(['user_id', 'month']):
+            written.append(_write_part(group[EXPERIMENT_COLUMNS], _partition_dir(archive_dir, user_id, month)))
+
+        db.session.query(CompostingExperiment).filter(
+            CompostingExperiment.id.in_(df['id'].tolist())
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for path in written:
+            os.remove(path)
+        raise
+
+    return len(df)
+
+def _find_archived_dates(user_id, experiment_id, archive_dir):
+    """Distinct date_created values of archived experiments with this id"""
+    dates = set()
+    for partition in sorted(glob.glob(os.path.join(archive_dir, f'user_id={user_id}', 'month=*'))):
+        with _partition_lock(partition):
+            for path in sorted(glob.glob(os.path.join(partition, '*.parquet'))):
+                keys = pd.read_parquet(path, columns=EXPERIMENT_KEY)
+                dates.update(keys.loc[keys['id'] == experiment_id, 'date_created'])
+    return dates
+
+def delete_archived_experiment(user_id, experiment_id, archive_dir, date_created=None):
+    """
+    Remove an experiment from a user's archive parts. When date_created is
+    known (e.g. from the hot row) only that month's partition is opened;
+    otherwise every partition is scanned, and ValueError is raised if the id
+    matches more than one archived experiment.
+    Returns True if it was found.
+    """
+    if date_created is None:
+        dates = _find_archived_dates(user_id, experiment_id, archive_dir)
+        if not dates:
+            return False
+        if len(dates) > 1:
+            raise ValueError(f'Experiment id {experiment_id} matches several archived experiments')
+        date_created = dates.pop()
+
+    date_created = pd.Timestamp(date_created)
+    partition = _partition_dir(archive_dir, user_id, date_created.strftime('%Y-%m'))
+    if not os.path.isdir(partition):
+        return False
+
+    found = False
+    with _partition_lock(partition):
+        for path in sorted(glob.glob(os.path.join(partition, '*.parquet'))):
+            keys = pd.read_parquet(path, columns=EXPERIMENT_KEY)
+            if not ((keys['id'] == experiment_id) & (keys['date_created'] == date_created)).any():
+                continue
+
+            df = pd.read_parquet(path)
+            remaining = df[(df['id'] != experiment_id) | (df['date_created'] != date_created)]
+            if not remaining.empty:
+                _write_part(remaining, partition)
+            os.remove(path)
+            found = True
+
+    return found
+
+def compact_archive(archive_dir):
+    """
+    Merge the part files of each archive partition into a single file.
+    Returns the number of partitions compacted.
+    """
+    compacted = 0
+    for partition in sorted(glob.glob(os.path.join(archive_dir, 'user_id=*', 'month=*'))):
+        with _partition_lock(partition):
+            parts = sorted(glob.glob(os.path.join(partition, '*.parquet')))
+            if len(parts) < 2:
+                continue
+
+            df = pd.concat([pd.read_parquet(path) for path in parts], ignore_index=True)
+            df = df.drop_duplicates(subset=EXPERIMENT_KEY).sort_values('date_created')
+
+            # Old parts are removed only after the merged one is in place; an
+            # interrupted run leaves duplicates that load_experiments drops
+            _write_part(df, partition)
+            for part in parts:
+                os.remove(part)
+        compacted += 1
+
+    return compacted
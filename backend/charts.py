@@ -0,0 +1,135 @@
+import os
+import json
+import uuid
+import hashlib
+
+import plotly.graph_objects as go
+
+# Bump whenever chart styling changes so cached images are re-rendered
+CHART_STYLE_VERSION = 1
+
+CHART_WIDTH = 800
+CHART_HEIGHT = 450
+
+CHART_TITLES = {
+    'efficiency_by_bin': 'Average Efficiency Score by Bin',
+    'temperature_vs_decomposition': 'Temperature vs Decomposition Time',
+    'npk_breakdown': 'Final NPK Breakdown by Bin'
+}
+
+def aggregate_chart_data(name, df):
+    """Reduce experiments to the JSON-serializable data a chart is drawn from"""
+    if name == 'efficiency_by_bin':
+        means = df.groupby('bin_id')['efficiency_score'].mean().round(2)
+        return {'bins': means.index.tolist(), 'scores': means.tolist()}
+
+    if name == 'temperature_vs_decomposition':
+        points = sorted(zip(df['daily_temperature'].astype(float), df['decomposition_days'].astype(int)))
+        return {
+            'temperature': [temperature for temperature, _ in points],
+            'days': [days for _, days in points]
+        }
+
+    if name == 'npk_breakdown':
+        means = df.groupby('bin_id')[['final_n', 'final_p', 'final_k']].mean().round(2)
+        return {
+            'bins': means.index.tolist(),
+            'n': means['final_n'].tolist(),
+            'p': means['final_p'].tolist(),
+            'k': means['final_k'].tolist()
+        }
+
+    raise ValueError(f'Unknown chart: {name}')
+
+def build_figure(name, data):
+    """Build a plotly figure from aggregated chart data"""
+    if name == 'efficiency_by_bin':
+        fig = go.Figure(go.Bar(x=data['bins'], y=data['scores'], marker_color='#4CAF50'))
+        fig.update_layout(xaxis_title='Bin ID', yaxis_title='Efficiency Score')
+    elif name == 'temperature_vs_decomposition':
+        fig = go.Figure(go.Scatter(
+            x=data['temperature'], y=data['days'], mode='markers', marker=dict(size=10, color='#FF9800')
+        ))
+        fig.update_layout(xaxis_title='Daily Temperature (°C)', yaxis_title='Decomposition Days')
+    elif name == 'npk_breakdown':
+        fig = go.Figure([
+            go.Bar(name='N', x=data['bins'], y=data['n']),
+            go.Bar(name='P', x=data['bins'], y=data['p']),
+            go.Bar(name='K', x=data['bins'], y=data['k'])
+        ])
+        fig.update_layout(barmode='stack', xaxis_title='Bin ID', yaxis_title='Final Value')
+    else:
+        raise ValueError(f'Unknown chart: {name}')
+
+    fig.update_layout(title=CHART_TITLES[name], template='plotly_white')
+    return fig
+
+def chart_cache_key(name, data):
+    """Content hash of a chart's aggregated input data"""
+    payload = json.dumps(
+        {'chart': name, 'version': CHART_STYLE_VERSION, 'data': data}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _evict(cache_dir, max_bytes, keep):
+    """Remove least recently used images, other than keep, until the cache fits in max_bytes"""
+    entries = []
+    for filename in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, filename)
+        if not filename.endswith('.png') or path == keep:
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    try:
+        total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    except FileNotFoundError:
+        total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def render_chart(name, df, cache_dir, max_bytes):
+    """
+    Return the PNG bytes for the named chart, rendering it only when no
+    image for the same aggregated data is already cached.
+    """
+    data = aggregate_chart_data(name, df)
+    path = os.path.join(cache_dir, f'{chart_cache_key(name, data)}.png')
+
+    # Another request may evict the file at any point, so read it directly
+    # rather than checking for it first
+    try:
+        with open(path, 'rb') as f:
+            image = f.read()
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            # Refresh mtime so eviction treats it as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return image
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        build_figure(name, data).write_image(tmp_path, format='png', width=CHART_WIDTH, height=CHART_HEIGHT)
+        with open(tmp_path, 'rb') as f:
+            image = f.read()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    _evict(cache_dir, max_bytes, keep=path)
+    return image
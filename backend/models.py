@@ -13,6 +13,9 @@ class User(db.Model):
     experiments = db.relationship('CompostingExperiment', backref='user', lazy=True)
 
 class CompostingExperiment(db.Model):
+    # Ids must never be reused once rows move to the archive
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     bin_id = db.Column(db.String(50), nullable=False)
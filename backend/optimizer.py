@@ -0,0 +1,231 @@
+import math
+
+import numpy as np
+from functools import lru_cache
+
+from analysis import (
+    SCORING_RULES_VERSION, CN_RATIO_BANDS, MOISTURE_BANDS, AERATION_BANDS,
+    TEMPERATURE_BANDS, calculate_efficiency_scores
+)
+
+# Candidate grid per controllable parameter as (min, max, step)
+PARAMETER_GRID = {
+    'cn_ratio': (10.0, 45.0, 0.5),
+    'moisture_level': (30.0, 80.0, 1.0),
+    'aeration_frequency': (0, 7, 1),
+    'daily_temperature': (30.0, 80.0, 1.0)
+}
+
+# Optimal band for each parameter, used to break ties between equal-scoring configurations
+OPTIMAL_BANDS = {
+    'cn_ratio': CN_RATIO_BANDS[0],
+    'moisture_level': MOISTURE_BANDS[0],
+    'aeration_frequency': AERATION_BANDS[0],
+    'daily_temperature': TEMPERATURE_BANDS[0]
+}
+
+BATCH_SIZE = 250000
+DEFAULT_ODOR_LEVEL = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# The model has 9 coefficients; require enough data that it is not simply interpolating
+MIN_MODEL_EXPERIMENTS = 30
+
+# Fitted model per user as {user_id: (data_signature, model)}
+_user_models = {}
+
+def _grid_axis(name, low, high):
+    """Grid values for a parameter that fall within [low, high]"""
+    grid_min, grid_max, step = PARAMETER_GRID[name]
+    axis = np.arange(grid_min, grid_max + step / 2, step)
+    return axis[(axis >= low) & (axis <= high)]
+
+def _clamp_range(name, low, high):
+    """
+    Clamp a range to the parameter grid. Raises ValueError when no grid
+    point falls inside it.
+    """
+    grid_min, grid_max, _ = PARAMETER_GRID[name]
+    low, high = max(low, grid_min), min(high, grid_max)
+    if name == 'aeration_frequency':
+        low, high = math.ceil(low), math.floor(high)
+    if _grid_axis(name, low, high).size == 0:
+        raise ValueError(f'No {name} values on the search grid fall within the requested range')
+    return low, high
+
+def parse_constraints(args):
+    """
+    Build a hashable constraint set from request args such as cn_ratio_min=20.
+    Raises ValueError for non-numeric, non-finite or empty ranges.
+    """
+    constraints = []
+    for name, (grid_min, grid_max, _) in PARAMETER_GRID.items():
+        low = float(args.get(f'{name}_min', grid_min))
+        high = float(args.get(f'{name}_max', grid_max))
+        if not (math.isfinite(low) and math.isfinite(high)):
+            raise ValueError(f'{name}_min and {name}_max must be finite numbers')
+        if low > high:
+            raise ValueError(f'{name}_min must not exceed {name}_max')
+        constraints.append((name, *_clamp_range(name, low, high)))
+    return tuple(constraints)
+
+def _feature_matrix(cn_ratio, moisture_level, aeration_frequency, daily_temperature):
+    """Quadratic features for the decomposition-time model"""
+    columns = [np.ones_like(cn_ratio, dtype=float)]
+    for values in (cn_ratio, moisture_level, aeration_frequency, daily_temperature):
+        values = np.asarray(values, dtype=float)
+        columns.extend([values, values ** 2])
+    return np.column_stack(columns)
+
+def fit_decomposition_model(df):
+    """
+    Fit a least-squares model predicting decomposition days from the
+    controllable parameters. Returns (coefficients, observed_ranges), or
+    None when there is not enough data to fit it.
+    """
+    if len(df) < MIN_MODEL_EXPERIMENTS:
+        return None
+
+    features = _feature_matrix(
+        df['cn_ratio'].to_numpy(),
+        df['moisture_level'].to_numpy(),
+        df['aeration_frequency'].to_numpy(),
+        df['daily_temperature'].to_numpy()
+    )
+    coefficients, _, _, _ = np.linalg.lstsq(
+        features, df['decomposition_days'].to_numpy(dtype=float), rcond=None
+    )
+    observed_ranges = tuple(
+        (name, float(df[name].min()), float(df[name].max())) for name in PARAMETER_GRID
+    )
+    # Rounded so the coefficients are a stable memoization key
+    return tuple(round(float(c), 6) for c in coefficients), observed_ranges
+
+def get_decomposition_model(user_id, signature, load_experiments):
+    """
+    Return the user's fitted model, refitting only when signature (a cheap
+    summary of their experiment data) has changed since the last fit.
+    """
+    cached = _user_models.get(user_id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    model = fit_decomposition_model(load_experiments())
+    _user_models[user_id] = (signature, model)
+    return model
+
+def restrict_to_model(constraints, model):
+    """
+    Intersect constraints with the range of data the model was fitted on so
+    it is never extrapolated. Returns None if the intersection is empty.
+    """
+    _, observed_ranges = model
+    restricted = []
+    for (name, low, high), (_, observed_min, observed_max) in zip(constraints, observed_ranges):
+        try:
+            restricted.append((name, *_clamp_range(name, max(low, observed_min), min(high, observed_max))))
+        except ValueError:
+            return None
+    return tuple(restricted)
+
+def predict_decomposition_days(model, cn_ratio, moisture_level, aeration_frequency, daily_temperature):
+    """Predict decomposition days for arrays of configurations"""
+    coefficients, _ = model
+    features = _feature_matrix(cn_ratio, moisture_level, aeration_frequency, daily_temperature)
+    return np.round(np.clip(features @ np.asarray(coefficients), 1, None), 1)
+
+def _centrality(configs):
+    """Summed normalized distance from the centre of each optimal band (lower is better)"""
+    distance = np.zeros(len(configs['cn_ratio']))
+    for name, (low, high, _) in OPTIMAL_BANDS.items():
+        centre = (low + high) / 2
+        half_width = (high - low) / 2
+        distance += np.abs(configs[name] - centre) / half_width
+    return distance
+
+def _pareto_select(scores, days, centrality, per_front_point):
+    """
+    Indices of configurations that are Pareto-optimal for (max score, min days),
+    keeping at most per_front_point of the most central ones per objective pair.
+    """
+    keep = []
+    best_days = np.inf
+    for score in np.unique(scores)[::-1]:
+        at_score = np.flatnonzero(scores == score)
+        level_days = days[at_score].min()
+        if level_days >= best_days:
+            continue
+        best_days = level_days
+        tied = at_score[days[at_score] == level_days]
+        keep.append(tied[np.argsort(centrality[tied], kind='stable')[:per_front_point]])
+    return np.concatenate(keep) if keep else np.array([], dtype=int)
+
+@lru_cache(maxsize=128)
+def _optimize_cached(rules_version, constraints, odor_level, model, limit):
+    """Memoized grid search; rules_version is part of the key so rule changes invalidate it"""
+    names = [name for name, _, _ in constraints]
+    axes = [_grid_axis(name, low, high) for name, low, high in constraints]
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape))
+
+    candidates = {name: np.array([]) for name in names}
+    candidates['efficiency_score'] = np.array([])
+    candidates['decomposition_days'] = np.array([])
+
+    for start in range(0, total, BATCH_SIZE):
+        flat = np.arange(start, min(start + BATCH_SIZE, total))
+        indices = np.unravel_index(flat, shape)
+        batch = {name: axis[index] for name, axis, index in zip(names, axes, indices)}
+
+        if model is not None:
+            days = predict_decomposition_days(
+                model, batch['cn_ratio'], batch['moisture_level'],
+                batch['aeration_frequency'], batch['daily_temperature']
+            )
+            # calculate_efficiency_score truncates days with int()
+            scored_days = np.floor(days)
+        else:
+            # Without a model every configuration has the same (unknown) duration
+            days = np.zeros(len(flat))
+            scored_days = np.full(len(flat), 100)
+
+        batch['decomposition_days'] = days
+        batch['efficiency_score'] = calculate_efficiency_scores(
+            batch['cn_ratio'], batch['moisture_level'], batch['aeration_frequency'],
+            batch['daily_temperature'], np.full(len(flat), odor_level), scored_days
+        )
+
+        # Merge with the running front so memory stays bounded by the front size
+        merged = {key: np.concatenate([candidates[key], batch[key]]) for key in candidates}
+        selected = _pareto_select(
+            merged['efficiency_score'], merged['decomposition_days'],
+            _centrality(merged), limit
+        )
+        candidates = {key: values[selected] for key, values in merged.items()}
+
+    order = np.lexsort((
+        _centrality(candidates), candidates['decomposition_days'], -candidates['efficiency_score']
+    ))[:limit]
+
+    results = []
+    for i in order:
+        results.append({
+            'cn_ratio': round(float(candidates['cn_ratio'][i]), 1),
+            'moisture_level': round(float(candidates['moisture_level'][i]), 1),
+            'aeration_frequency': int(candidates['aeration_frequency'][i]),
+            'daily_temperature': round(float(candidates['daily_temperature'][i]), 1),
+            'efficiency_score': int(candidates['efficiency_score'][i]),
+            'expected_decomposition_days': (
+                float(candidates['decomposition_days'][i]) if model is not None else None
+            )
+        })
+    return tuple(results)
+
+def optimize_parameters(constraints, odor_level=DEFAULT_ODOR_LEVEL, model=None, limit=DEFAULT_LIMIT):
+    """
+    Return the Pareto-best (cn_ratio, moisture, aeration, temperature)
+    configurations within constraints, scored with the rules in analysis.py.
+    Results are memoized per rules version, constraint set and model.
+    """
+    results = _optimize_cached(SCORING_RULES_VERSION, constraints, odor_level, model, limit)
+    return [dict(result) for result in results]
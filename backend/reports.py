@@ -1,13 +1,19 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from datetime import datetime
+import io
 import os
 
-def generate_pdf_report(df, username):
-    """Generate PDF report with experiment summary and insights"""
+from charts import CHART_WIDTH, CHART_HEIGHT
+
+def generate_pdf_report(df, username, charts=None):
+    """
+    Generate PDF report with experiment summary and insights.
+    charts is an optional list of (title, png_bytes) pairs to embed.
+    """
     filename = f'reports/composting_report_{username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
     os.makedirs('reports', exist_ok=True)
     
@@ -60,6 +66,14 @@ def generate_pdf_report(df, username):
     story.append(summary_table)
     story.append(Spacer(1, 20))
     
+    # Charts
+    if charts:
+        story.append(Paragraph("Charts", styles['Heading2']))
+        for title, image in charts:
+            story.append(Paragraph(title, styles['Heading3']))
+            story.append(Image(io.BytesIO(image), width=6 * inch, height=6 * inch * CHART_HEIGHT / CHART_WIDTH))
+            story.append(Spacer(1, 20))
+    
     # Top 3 Performing Bins
     story.append(Paragraph("Top 3 Performing Bins", styles['Heading2']))
     
@@ -4,6 +4,14 @@ const API_BASE_URL = 'http://localhost:5000/api';
 let experimentsData = [];
 let analyticsData = {};
 
+// Charts rendered server-side, keyed by container id. The client-side
+// builder is used only if the image cannot be loaded.
+const SERVER_CHARTS = {
+    efficiencyChart: { name: 'efficiency_by_bin', fallback: createEfficiencyChart },
+    tempChart: { name: 'temperature_vs_decomposition', fallback: createTemperatureChart },
+    npkChart: { name: 'npk_breakdown', fallback: createNPKChart }
+};
+
 // Initialize dashboard
 document.addEventListener('DOMContentLoaded', function() {
     if (!checkAuth()) {
@@ -113,12 +121,48 @@ function createCharts() {
         return;
     }
     
-    createEfficiencyChart();
-    createTemperatureChart();
-    createNPKChart();
+    Object.entries(SERVER_CHARTS).forEach(([containerId, chart]) => {
+        loadServerChart(containerId, chart.name, chart.fallback);
+    });
     createParameterChart();
 }
 
+// Load a server-rendered chart image. The endpoint requires the JWT, which a
+// plain <img src> cannot send, so fetch it and display it from a blob URL.
+async function loadServerChart(containerId, chartName, fallback) {
+    const container = document.getElementById(containerId);
+    if (!container) return;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/charts/${chartName}.png`, {
+            headers: getHeaders()
+        });
+        
+        if (!response.ok) {
+            throw new Error(`Failed to load chart ${chartName}`);
+        }
+        
+        const blob = await response.blob();
+        
+        if (container.dataset.objectUrl) {
+            URL.revokeObjectURL(container.dataset.objectUrl);
+        }
+        const objectUrl = URL.createObjectURL(blob);
+        container.dataset.objectUrl = objectUrl;
+        
+        Plotly.purge(container);
+        container.innerHTML = '';
+        const img = document.createElement('img');
+        img.src = objectUrl;
+        img.alt = chartName;
+        img.style.width = '100%';
+        container.appendChild(img);
+    } catch (error) {
+        console.error('Error loading chart:', error);
+        fallback();
+    }
+}
+
 // Efficiency scores by bin chart
 function createEfficiencyChart() {
     const data = analyticsData.chart_data?.efficiency_by_bin || {};